@@ -0,0 +1,78 @@
+import argparse
+from datetime import datetime
+from main import PARENT_FOLDER_ID
+from module2.drive_api import GoogleDriveManager
+from module4.database import DatabaseManager
+import module5.utils as utils
+
+def archive(keep_terms, archive_folder_id=None, save_manifest=True):
+    """ Archive the report folders of previous terms.
+
+    This program retires the term folders created by previous runs of the
+    report generator. Every term folder outside the retention window is either
+    moved into an archive folder or moved to the trash with a single
+    folder-level call, so the reports inside it are never touched one by one.
+    The IDs of the reports contained in each archived term can be saved to
+    the SQLite database.
+
+    Args:
+        keep_terms (int): The number of most recent terms to keep in the parent folder.
+        archive_folder_id (str): The ID of the folder the old terms are moved into.
+            If None, the old term folders are moved to the trash instead.
+        save_manifest (bool): Whether to save the report IDs of each archived term
+            to the database. They are listed before archiving, but only saved for the
+            terms that were archived successfully.
+
+    Raises:
+        sqlite3.Error: If the manifest cannot be saved to the SQLite database.
+
+    Returns:
+        None
+    """
+    start_time = datetime.now()
+    utils.log_run_header() # Set header for logging
+
+    # Create an instance of GoogleDriveManager
+    drive_manager = GoogleDriveManager(PARENT_FOLDER_ID)
+
+    # Find the term folders outside of the retention window
+    utils.logger.debug("# Finding expired term folders")
+    term_folders = drive_manager.find_expired_term_folders(keep_terms)
+    if not term_folders:
+        utils.logger.info(f"No term folders older than the last {keep_terms} terms. Nothing to archive.")
+        return
+
+    # List the reports of each term while the term folders are still in the parent folder
+    if save_manifest:
+        utils.logger.debug("# Listing the reports of each term folder")
+        manifests = drive_manager.collect_term_manifests(term_folders)
+
+    # Move or trash the term folders
+    archived = drive_manager.archive_term_folders(term_folders, archive_folder_id)
+    utils.logger.info(f"Archived {len(archived)} of {len(term_folders)} term folders.")
+
+    # Save the manifest of the terms that were archived
+    if save_manifest and archived:
+        utils.logger.debug("# Saving archive manifest to database")
+        db_manager = DatabaseManager('data/roster.db')
+        db_manager.save_archive_manifest([report for term_folder in archived
+                                          for report in manifests[term_folder["id"]]])
+
+    # Log and Print total run time
+    duration = datetime.now() - start_time
+    utils.logger.info(f"Total run time: {duration}")
+
+if __name__ == "__main__":
+    # Parse command-line arguments
+    parser = argparse.ArgumentParser(description="Archive the report folders of previous terms.")
+    parser.add_argument("keep_terms", type=int, help="Number of most recent terms to keep")
+    parser.add_argument("--archive-folder-id", type=str, default=None,
+                        help="Folder to move old terms into (old terms are trashed if omitted)")
+    parser.add_argument("--no-manifest", action="store_true",
+                        help="Do not save the report IDs of archived terms to the database")
+    args = parser.parse_args()
+    if args.keep_terms < 1:
+        parser.error("keep_terms must be at least 1 so the current term is kept")
+
+    # Archive program
+    archive(args.keep_terms, args.archive_folder_id, not args.no_manifest)
@@ -0,0 +1 @@
+# Lets pytest import the project modules (module1 ... module6) from the repository root.
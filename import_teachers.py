@@ -0,0 +1,14 @@
+import argparse
+from module4.database import DatabaseManager
+import module5.utils as utils
+
+if __name__ == "__main__":
+    # Parse command-line arguments
+    parser = argparse.ArgumentParser(description="Load the teachers of each course from a CSV file.")
+    parser.add_argument("csv_path", type=str, help="CSV file with a course_name,teacher_email header")
+    parser.add_argument("--db-path", type=str, default="data/roster.db", help="Path of the roster database")
+    args = parser.parse_args()
+
+    utils.log_run_header() # Set header for logging
+    db_manager = DatabaseManager(args.db_path)
+    db_manager.import_course_teachers(args.csv_path)
@@ -1,16 +1,24 @@
 import argparse
+import time
 from datetime import datetime
 from module2.drive_api import GoogleDriveManager
+from module2.fake_drive import FakeDriveManager
 from module4.database import DatabaseManager
+from module4.roster_snapshot import RosterSnapshot
 import module5.utils as utils
 
-def main(start_year, end_year, term_number, mode):
+# Define the parent folder ID where the main destination folder will be created
+PARENT_FOLDER_ID = "1jZ-d76K-h2nvYGIwHjlsj6fnPJ_c17WZ"
+
+def main(start_year, end_year, term_number, mode, snapshot_path=None, per_course=2, sample_size=None, target="drive",
+         sandbox_folder_id=None, fake_latency=0.0, share=True):
     """ Generate and organize student report templates.
 
     This program creates and organizes report templates for students 
     based on a specified school term and mode of operation. It uses
     a predefined report template, retrieves student data from a SQLite 
     database, and generates individual reports sorted by course folders. 
+    In normal mode, each course folder is then shared with its teachers.
 
     Args:
         start_year (int): The starting year of the school term. 
@@ -18,7 +26,17 @@ def main(start_year, end_year, term_number, mode):
         term_number (int): The term number (e.g - 1 for Fall, 2 for Winter, etc.)
         mode (str): The mode of operation, either 'normal' or 'test'.
             - 'normal': Generate reports for all students.
-            - 'test': Generate reports for students in a smaller data set. 
+            - 'test': Generate reports for a stratified sample of students and
+                      project the run time and API usage of a normal run.
+        snapshot_path (str): Optional roster snapshot to read students from instead of the database.
+        per_course (int): In test mode, the number of students sampled from each course.
+        sample_size (int): In test mode, an optional limit on the total number of students.
+        target (str): In test mode, where reports are created, either 'drive' or 'fake'.
+            - 'drive': Create reports in Google Drive, inside `sandbox_folder_id` if given.
+            - 'fake': Create reports in a local stand-in for Google Drive.
+        sandbox_folder_id (str): In test mode, the folder used instead of the parent folder.
+        fake_latency (float): In test mode with the 'fake' target, seconds each fake Drive call takes.
+        share (bool): In normal mode, whether to share the course folders with their teachers.
     
     Raises:
         sqlite3.Error: If there's an error connecting to the SQLite database. 
@@ -29,11 +47,16 @@ def main(start_year, end_year, term_number, mode):
     start_time = datetime.now()
     utils.log_run_header() # Set header for logging
 
-    # Define the parent folder ID where the main destination folder will be created
-    PARENT_FOLDER_ID = "1jZ-d76K-h2nvYGIwHjlsj6fnPJ_c17WZ"
-
-    # Create an instance of GoogleDriveManager
-    drive_manager = GoogleDriveManager(PARENT_FOLDER_ID)
+    # Create an instance of GoogleDriveManager (or its local stand-in for test runs)
+    if mode != "test" and (target != "drive" or sandbox_folder_id):
+        utils.logger.warning("The target and sandbox folder only apply in test mode; using the parent folder.")
+    parent_folder_id = PARENT_FOLDER_ID
+    if mode == "test" and sandbox_folder_id:
+        parent_folder_id = sandbox_folder_id
+    if mode == "test" and target == "fake":
+        drive_manager = FakeDriveManager(parent_folder_id, fake_latency)
+    else:
+        drive_manager = GoogleDriveManager(parent_folder_id)
 
     # Create parent destination for reports
     folder_id = drive_manager.create_destination_folder(start_year, end_year, term_number) # Parent directory for created reports
@@ -42,17 +65,32 @@ def main(start_year, end_year, term_number, mode):
     # Create an instance of DatabaseManager
     db_manager = DatabaseManager('data/roster.db')
     
-    # Retrieve student data from database
-    utils.logger.debug("# Retreiving student data from database")
-    if mode == "test":
-        students_data = db_manager.select_students_test()
+    # Retrieve student data from a roster snapshot if given, otherwise from the database
+    roster_counts = None
+    if snapshot_path:
+        utils.logger.debug("# Retreiving student data from roster snapshot")
+        snapshot = RosterSnapshot.load(snapshot_path)
+        if mode == "test":
+            students_data = snapshot.stratified_sample(per_course, sample_size)
+        else:
+            students_data = list(snapshot.rows())
+        roster_counts = (len(snapshot), len(snapshot.course_ids))
+        snapshot.close()
     else:
-        students_data = db_manager.select_all_students()
+        utils.logger.debug("# Retreiving student data from database")
+        if mode == "test":
+            students_data = db_manager.select_students_test(per_course, sample_size)
+        else:
+            students_data = db_manager.select_all_students()
     
     # Create a dictionary to track course folders
     utils.logger.debug("# Creating a dictionary to track course folders")
     course_folders = {}
 
+    # Track time spent on folders and reports to project the duration of a normal run
+    folder_seconds = 0.0
+    report_seconds = 0.0
+
     if students_data:
         for last_name, first_name, course_name in students_data:
             # Check if course folder exists; if not, create it
@@ -60,19 +98,47 @@ def main(start_year, end_year, term_number, mode):
 
             # If it doesn't exist, create it and store the ID
             if not course_folder_id:
+                folder_start = time.perf_counter()
                 course_folder_id = drive_manager.create_course_folder(course_name, folder_id)
+                folder_seconds += time.perf_counter() - folder_start
                 course_folders[course_name] = course_folder_id
                 utils.logger.info(f"Folder: '{course_name}' successfully created in parent directory.")
 
             # Copy the template for current student
             utils.logger.debug("# Copying the template for current student")
+            report_start = time.perf_counter()
             unformatted_report_id = drive_manager.copy_template(course_folder_id, source_file_id)
 
             # Format the new title
             formatted_title = f"{last_name}, {first_name} ({course_name})"
             drive_manager.format_document_title(unformatted_report_id, formatted_title)
+            report_seconds += time.perf_counter() - report_start
     
     utils.logger.info("Reports generated and sorted successfully.")
+
+    # Share each course folder with its teachers; the reports inherit access from the folder
+    if mode == "normal" and share and course_folders:
+        utils.logger.debug("# Sharing course folders with teachers")
+        course_teachers = db_manager.select_course_teachers()
+        if course_teachers:
+            drive_manager.share_course_folders(course_folders, course_teachers)
+
+    # Project the run time and API usage of a normal run from the sample
+    if mode == "test":
+        total_reports, total_folders = roster_counts or db_manager.count_roster()
+
+        # Sharing lists the permissions of each shared folder and creates at most one grant per teacher
+        share_calls = 0
+        if share:
+            shared_folders, course_teachers = db_manager.count_course_teachers()
+            share_calls = shared_folders + course_teachers
+
+        simulated_latency = None
+        if target == "fake":
+            utils.logger.info(f"Fake drive calls made by the test run: {drive_manager.calls}")
+            simulated_latency = fake_latency
+        utils.log_run_projection(len(course_folders), folder_seconds, len(students_data or []),
+                                 report_seconds, total_folders, total_reports, share_calls, simulated_latency)
     
     # Record the end time
     end_time = datetime.now()
@@ -89,7 +155,29 @@ if __name__ == "__main__":
     parser.add_argument("term_number", type=int, help="Term number")
     parser.add_argument("mode", type=str, nargs="?", default="normal", choices=["normal", "test"],
                         help="Mode of operation (normal or test)")
+    parser.add_argument("--per-course", type=int, default=2,
+                        help="Test mode: number of students sampled from each course")
+    parser.add_argument("--sample-size", type=int, default=None,
+                        help="Test mode: maximum total number of students sampled")
+    parser.add_argument("--target", type=str, default="drive", choices=["drive", "fake"],
+                        help="Test mode: create reports in Google Drive or in a local fake drive")
+    parser.add_argument("--sandbox-folder-id", type=str, default=None,
+                        help="Test mode: Drive folder to use instead of the parent folder")
+    parser.add_argument("--fake-latency", type=float, default=0.0,
+                        help="Test mode with the fake target: seconds each fake Drive call takes")
+    parser.add_argument("--no-share", action="store_true",
+                        help="Do not share the course folders with their teachers")
+    parser.add_argument("--snapshot", type=str, default=None,
+                        help="Roster snapshot to read students from instead of the database")
     args = parser.parse_args()
+    if args.per_course < 1:
+        parser.error("--per-course must be at least 1")
+    if args.sample_size is not None and args.sample_size < 1:
+        parser.error("--sample-size must be at least 1")
+    if args.fake_latency < 0:
+        parser.error("--fake-latency cannot be negative")
 
     # Main program
-    main(args.start_year, args.end_year, args.term_number, args.mode)
\ No newline at end of file
+    main(args.start_year, args.end_year, args.term_number, args.mode, args.snapshot,
+         args.per_course, args.sample_size, args.target, args.sandbox_folder_id, args.fake_latency,
+         not args.no_share)
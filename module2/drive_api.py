@@ -1,24 +1,36 @@
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 import google.auth.exceptions
 from module1.auth import authenticate
+from module2.transport import HttpPool, DEFAULT_POOL_SIZE, DEFAULT_TIMEOUT, DEFAULT_CHECKOUT_TIMEOUT
 from module5.utils import logger
+import re
 import time
 
+FOLDER_MIME_TYPE = "application/vnd.google-apps.folder"
+TERM_FOLDER_PATTERN = re.compile(r"^(\d{4})_(\d{4})_T(\d+)$") # Matches "startYear_endYear_TtermNumber"
+BATCH_SIZE = 100 # Maximum number of calls the Drive API accepts in a single batch request
+SHARE_BATCH_SIZE = 20 # Sharing has a lower rate limit, so permission grants are sent in smaller batches
+SHARE_BATCH_INTERVAL = 1.0 # Seconds to wait between batches of permission grants
+
 class GoogleDriveManager:
-    def __init__(self, parent_folder_id):
+    def __init__(self, parent_folder_id, pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT,
+                 checkout_timeout=DEFAULT_CHECKOUT_TIMEOUT):
         """
         Initialize the GoogleDriveManager with a specified parent folder ID and 
         authenticate with Google Drive.
 
         This constructor sets up the GoogleDriveManager instance by storing the 
         ID of the top-level parent folder and authenticating with Google Drive. 
-        It builds the drive service for use by other methods of the class.
+        It builds the drive service for use by other methods of the class. Every
+        call is sent through a pool of authorized keep-alive connections.
 
         Args:
             parent_folder_id (str): The Google Drive folder ID of the top-level 
                                     parent directory where the initial folders 
                                     will be created.
+            pool_size (int): The number of pooled connections to Google Drive.
+            timeout (int): The socket timeout in seconds of each connection.
+            checkout_timeout (int): The seconds a call waits for a free pooled connection.
         Raises:
             Exception: If authentication fails or the drive service cannot be built.
         """
@@ -32,7 +44,8 @@ class GoogleDriveManager:
             logger.error("Failed to obtain credentials; cannot proceed with Google Drive operations")
             raise Exception("Google Drive authentication failed")
         try:
-            self.drive_service = build('drive', 'v3', credentials=self.credentials)
+            self.http_pool = HttpPool(self.credentials, pool_size, timeout, checkout_timeout)
+            self.drive_service = self.http_pool.build_service('drive', 'v3')
             logger.debug("# Google Drive service built successfully")
         except google.auth.exceptions.DefaultCredentialsError as e:
             logger.error("Default credentials not found.")
@@ -42,7 +55,7 @@ class GoogleDriveManager:
         """Create metadata for a new folder"""
         return {
             "name": folder_name,
-            "mimeType": "application/vnd.google-apps.folder",
+            "mimeType": FOLDER_MIME_TYPE,
             "parents": [parent_id]
         }
 
@@ -76,10 +89,10 @@ class GoogleDriveManager:
         for attempt in range(5):
             try:
                 logger.debug("# Creating the folder")
-                folder = self.drive_service.files().create(
+                folder = self.http_pool.execute(self.drive_service.files().create(
                     body=file_metadata,
                     fields='id'
-                ).execute()
+                ))
 
                 # Return folder ID for future use
                 logger.debug("# Returning folder ID")
@@ -128,10 +141,10 @@ class GoogleDriveManager:
         for attempt in range(5):
             try:
                 logger.debug("# Creating the folder")
-                folder = self.drive_service.files().create(
+                folder = self.http_pool.execute(self.drive_service.files().create(
                     body=file_metadata,
                     fields='id'
-                ).execute()
+                ))
                     
                 # Return folder ID
                 logger.debug("# Returning folder ID")
@@ -172,13 +185,13 @@ class GoogleDriveManager:
 
         # Copy the template to the new location
         logger.debug("# Copying the template")
-        file = self.drive_service.files().copy(
+        file = self.http_pool.execute(self.drive_service.files().copy(
             fileId=source_file_id, 
             body=file_metadata, 
-            fields="id, name"
-            ).execute()
+            fields="id"
+            ))
 
-        logger.debug(f"File '{file.get("name")}' ID ({file.get("id")}) created successfully.")
+        logger.debug(f"File ID ({file.get('id')}) created successfully.")
         return file.get('id')
 
     def format_document_title(self, unformatted_report_id, formatted_title):
@@ -204,12 +217,313 @@ class GoogleDriveManager:
 
             # Update the document title using Drive API
             logger.debug(f"# Updating the document title for document ID: {unformatted_report_id}")
-            self.drive_service.files().update(
+            self.http_pool.execute(self.drive_service.files().update(
                 fileId=unformatted_report_id,
-                body=new_title_metadata
-            ).execute()
+                body=new_title_metadata,
+                fields="id"
+            ))
             logger.info(f"Report created for: {formatted_title}")
 
         except Exception as e:
             logger.error(f"An error occurred while updating the document title: {e}")
             raise
+
+    def _execute_batch(self, requests, batch_size=BATCH_SIZE, interval=0):
+        """
+        Sends a list of Drive API requests as batched HTTP requests.
+
+        The requests are grouped into batches of at most `batch_size` calls. Calls that fail 
+        with a retryable error, or whose whole batch fails with one, are re-sent in a new batch 
+        using exponential backoff. A batch that fails with any other error is recorded against 
+        each of its calls, and the remaining batches are still sent.
+
+        Parameters:
+        - requests (list): A list of (request_id, request) tuples, where `request` is an 
+                           unexecuted Drive API request.
+        - batch_size (int): The maximum number of calls per batch. Defaults to `BATCH_SIZE`.
+        - interval (float): Seconds to wait between two batches, to stay under rate limits.
+
+        Returns:
+        - tuple: A dictionary of responses and a dictionary of errors, both keyed by request_id.
+        """
+        logger.debug(f"# Calling _execute_batch() with {len(requests)} requests:")
+        responses = {}
+        errors = {}
+
+        def callback(request_id, response, exception):
+            if exception is None:
+                responses[request_id] = response
+                errors.pop(request_id, None)
+            else:
+                errors[request_id] = exception
+
+        pending = list(requests)
+        for attempt in range(5):
+            for start in range(0, len(pending), batch_size):
+                if start and interval:
+                    time.sleep(interval) # Rate limit between batches
+                chunk = pending[start:start + batch_size]
+                batch = self.drive_service.new_batch_http_request(callback=callback)
+                for request_id, request in chunk:
+                    batch.add(request, request_id=request_id)
+                try:
+                    self.http_pool.execute(batch)
+                except HttpError as error:
+                    # Record the error against every call of the batch and keep going
+                    logger.error(f"Attempt {attempt + 1}: Failed to send batch request. Error: {error}")
+                    for request_id, _ in chunk:
+                        errors[request_id] = error
+
+            # Only retry the calls that failed with a retryable error
+            retryable = {request_id for request_id, error in errors.items()
+                         if isinstance(error, HttpError) and error.status_code in [429, 500, 502, 503, 504]}
+            pending = [(request_id, request) for request_id, request in pending if request_id in retryable]
+            if not pending or attempt == 4:
+                break
+            logger.error(f"Attempt {attempt + 1}: {len(pending)} batched requests failed. Retrying.")
+            time.sleep(2 ** attempt) # Exponential backoff
+
+        for request_id, error in errors.items():
+            logger.error(f"Batched request '{request_id}' failed. Error: {error}")
+        return responses, errors
+
+    def _list_children_request(self, parent_id, folders, page_token=None):
+        """Create a request listing the folders (or non-folder files) directly inside parent_id"""
+        operator = "=" if folders else "!="
+        query = f"'{parent_id}' in parents and mimeType {operator} '{FOLDER_MIME_TYPE}' and trashed = false"
+        return self.drive_service.files().list(
+            q=query,
+            fields="nextPageToken, files(id, name)",
+            pageSize=1000,
+            pageToken=page_token
+        )
+
+    def _list_children(self, parent_id, folders, page_token=None):
+        """Return the id and name of every folder (or non-folder file) directly inside parent_id"""
+        children = []
+        while True:
+            response = self.http_pool.execute(self._list_children_request(parent_id, folders, page_token))
+            children.extend(response.get("files", []))
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                return children
+
+    def _list_children_batched(self, parent_ids, folders):
+        """
+        Lists the children of several folders at once.
+
+        The first page of every folder is requested in batches; only folders with more 
+        than one page of children are then listed on their own.
+
+        Parameters:
+        - parent_ids (list): The IDs of the folders to list.
+        - folders (bool): True to list child folders, False to list the other files.
+
+        Returns:
+        - dict: The `id` and `name` of every child, keyed by parent folder ID.
+
+        Raises:
+        - Exception: If the children of a folder cannot be listed.
+        """
+        requests = [(parent_id, self._list_children_request(parent_id, folders)) for parent_id in parent_ids]
+        responses, errors = self._execute_batch(requests)
+        if errors:
+            raise Exception(f"Failed to list the contents of {len(errors)} folders")
+
+        children = {}
+        for parent_id in parent_ids:
+            response = responses[parent_id]
+            children[parent_id] = response.get("files", [])
+            if response.get("nextPageToken"):
+                children[parent_id] += self._list_children(parent_id, folders, response["nextPageToken"])
+        return children
+
+    def find_expired_term_folders(self, keep_terms):
+        """
+        Finds the term folders in the parent directory that fall outside the retention window.
+
+        Term folders are the folders named "startYear_endYear_TtermNumber" by 
+        `create_destination_folder`. Folders are grouped by term, since reruns can leave several 
+        folders with the same name, and the terms are ordered from newest to oldest. Every folder 
+        of a term after the first `keep_terms` terms is considered expired. Other folders are ignored.
+
+        Parameters:
+        - keep_terms (int): The number of most recent terms to keep in the parent directory.
+
+        Returns:
+        - list: A list of dictionaries with the `id` and `name` of each expired term folder, 
+                newest first.
+
+        Raises:
+        - ValueError: If `keep_terms` is less than 1.
+        """
+        logger.debug(f"# Calling find_expired_term_folders({keep_terms}):")
+
+        if keep_terms < 1:
+            raise ValueError("keep_terms must be at least 1 so the current term is kept")
+
+        # Group the folders by (start year, end year, term number)
+        term_folders = {}
+        for folder in self._list_children(self.parent_folder_id, folders=True):
+            match = TERM_FOLDER_PATTERN.match(folder["name"])
+            if match:
+                term = tuple(int(part) for part in match.groups())
+                term_folders.setdefault(term, []).append(folder)
+
+        expired_terms = sorted(term_folders, reverse=True)[keep_terms:]
+        return [folder for term in expired_terms for folder in term_folders[term]]
+
+    def collect_term_manifests(self, term_folders):
+        """
+        Lists the reports contained in each term folder.
+
+        The course folders of every term, then the reports of every course folder, are 
+        listed with batched requests.
+
+        Parameters:
+        - term_folders (list): A list of dictionaries with the `id` and `name` of each term folder.
+
+        Returns:
+        - dict: For each term folder ID, a list of dictionaries with the term folder name, 
+                course name, report ID and report name of every report in the term folder.
+        """
+        logger.debug(f"# Calling collect_term_manifests() for {len(term_folders)} folders:")
+
+        course_folders = self._list_children_batched([term_folder["id"] for term_folder in term_folders], folders=True)
+        reports = self._list_children_batched(
+            [course_folder["id"] for children in course_folders.values() for course_folder in children], folders=False)
+
+        manifests = {}
+        for term_folder in term_folders:
+            manifest = manifests[term_folder["id"]] = []
+            for course_folder in course_folders[term_folder["id"]]:
+                for report in reports[course_folder["id"]]:
+                    manifest.append({
+                        "term_folder": term_folder["name"],
+                        "course_name": course_folder["name"],
+                        "report_id": report["id"],
+                        "report_name": report["name"]
+                    })
+            logger.info(f"Manifest for {term_folder['name']}: {len(manifest)} reports.")
+        return manifests
+
+    def archive_term_folders(self, term_folders, archive_folder_id=None):
+        """
+        Moves or trashes whole term folders using a single folder-level call per term.
+
+        If `archive_folder_id` is provided, each term folder is moved out of the parent 
+        directory into the archive folder. Otherwise each term folder is moved to the trash. 
+        The reports inside a term folder follow it, so no per-file calls are made. All calls 
+        are sent as batched requests.
+
+        Parameters:
+        - term_folders (list): A list of dictionaries with the `id` and `name` of each term folder.
+        - archive_folder_id (str): The ID of the folder the term folders are moved into. 
+                                   Defaults to None, which trashes the term folders instead.
+
+        Returns:
+        - list: The term folders (`id` and `name`) that were archived successfully.
+        """
+        logger.debug(f"# Calling archive_term_folders() for {len(term_folders)} folders:")
+
+        requests = []
+        for term_folder in term_folders:
+            if archive_folder_id:
+                request = self.drive_service.files().update(
+                    fileId=term_folder["id"],
+                    addParents=archive_folder_id,
+                    removeParents=self.parent_folder_id,
+                    fields="id"
+                )
+            else:
+                request = self.drive_service.files().update(
+                    fileId=term_folder["id"],
+                    body={"trashed": True},
+                    fields="id"
+                )
+            requests.append((term_folder["id"], request))
+
+        # Request IDs are folder IDs, since reruns can leave several folders with the same name
+        responses, _ = self._execute_batch(requests)
+        action = "moved to archive" if archive_folder_id else "moved to trash"
+        archived = [term_folder for term_folder in term_folders if term_folder["id"] in responses]
+        for term_folder in archived:
+            logger.info(f"Folder: {term_folder['name']} {action}.")
+        return archived
+
+    def share_course_folders(self, course_folders, course_teachers, role="writer"):
+        """
+        Shares each course folder with the teachers of that course.
+
+        Permissions are granted once per course folder, so every report inside it inherits 
+        access. Existing permissions are read first and grants that already exist are 
+        skipped. Notification emails are not sent. Both steps are sent as batched requests. 
+        The grants are sent in rounds holding at most one grant per folder, so no batch 
+        changes the same folder twice, and in small batches spaced out to respect sharing 
+        rate limits.
+
+        Parameters:
+        - course_folders (dict): The ID of each course folder, keyed by course name.
+        - course_teachers (list): A list of (course name, teacher email) tuples.
+        - role (str): The role granted to the teachers. Defaults to "writer".
+
+        Returns:
+        - int: The number of permissions created.
+
+        Raises:
+        - Exception: If the existing permissions of the course folders cannot be read.
+        """
+        logger.debug(f"# Calling share_course_folders() for {len(course_folders)} folders:")
+
+        # Only share the folders that were created and have a teacher
+        grants = {(course_folders[course_name], email.lower())
+                  for course_name, email in course_teachers
+                  if course_name in course_folders and email}
+        folder_ids = sorted({folder_id for folder_id, _ in grants})
+
+        # Read the existing permissions of every folder, one page of every folder per batch
+        existing = set()
+        page_tokens = {folder_id: None for folder_id in folder_ids}
+        while page_tokens:
+            list_requests = [(folder_id, self.drive_service.permissions().list(
+                fileId=folder_id,
+                fields="nextPageToken, permissions(emailAddress)",
+                pageSize=100,
+                pageToken=page_token
+            )) for folder_id, page_token in page_tokens.items()]
+            existing_permissions, errors = self._execute_batch(list_requests)
+            if errors:
+                raise Exception(f"Failed to read the permissions of {len(errors)} course folders")
+
+            existing.update((folder_id, permission.get("emailAddress", "").lower())
+                            for folder_id, response in existing_permissions.items()
+                            for permission in response.get("permissions", []))
+            page_tokens = {folder_id: response["nextPageToken"]
+                           for folder_id, response in existing_permissions.items()
+                           if response.get("nextPageToken")}
+        missing = sorted(grants - existing)
+        logger.info(f"{len(grants) - len(missing)} grants already exist; {len(missing)} to create.")
+
+        # Round k holds the k-th missing grant of every folder, so a batch touches each folder once
+        folder_emails = {}
+        for folder_id, email in missing:
+            folder_emails.setdefault(folder_id, []).append(email)
+        rounds = [[(folder_id, emails[k]) for folder_id, emails in folder_emails.items() if k < len(emails)]
+                  for k in range(max(map(len, folder_emails.values()), default=0))]
+
+        # Grant the missing permissions
+        created = 0
+        for index, round_grants in enumerate(rounds):
+            if index:
+                time.sleep(SHARE_BATCH_INTERVAL) # Rate limit between rounds
+            create_requests = [(f"{folder_id}:{email}", self.drive_service.permissions().create(
+                fileId=folder_id,
+                body={"type": "user", "role": role, "emailAddress": email},
+                sendNotificationEmail=False,
+                fields="id"
+            )) for folder_id, email in round_grants]
+            responses, _ = self._execute_batch(create_requests, SHARE_BATCH_SIZE, SHARE_BATCH_INTERVAL)
+            created += len(responses)
+
+        logger.info(f"Shared {created} of {len(missing)} course folder permissions.")
+        return created
@@ -0,0 +1,53 @@
+# Local stand-in for GoogleDriveManager used by test runs that should not touch Google Drive.
+import time
+import uuid
+from module5.utils import logger
+
+class FakeDriveManager:
+    def __init__(self, parent_folder_id, latency=0.0):
+        """
+        Initialize the FakeDriveManager with a specified parent folder ID.
+
+        The fake drive keeps its folders and files in memory and offers the same methods
+        as GoogleDriveManager that the main program uses. Every call is counted so a test
+        run can report how many Drive API calls a real run would make.
+
+        Args:
+            parent_folder_id (str): The ID given to the top-level parent directory.
+            latency (float): Seconds each call sleeps for, to simulate a round trip to Drive.
+        """
+        self.parent_folder_id = parent_folder_id
+        self.latency = latency
+        self.files = {parent_folder_id: {"name": "parent", "parents": []}}
+        self.calls = 0
+
+    def _create_file(self, name, parent_id):
+        """Record a new file or folder and return its ID"""
+        self.calls += 1
+        time.sleep(self.latency)
+        if parent_id not in self.files:
+            raise Exception(f"Parent folder not found: {parent_id}")
+        file_id = uuid.uuid4().hex
+        self.files[file_id] = {"name": name, "parents": [parent_id]}
+        return file_id
+
+    def create_destination_folder(self, start_year, end_year, term_number):
+        """Create a fake folder named in the format "startYear_endYear_TtermNumber" """
+        folder_name = f"{start_year}_{end_year}_T{term_number}"
+        logger.info(f"Folder: {folder_name} created successfully (fake drive)")
+        return self._create_file(folder_name, self.parent_folder_id)
+
+    def create_course_folder(self, course_name, parent_id):
+        """Create a fake folder for the given course name"""
+        return self._create_file(course_name, parent_id)
+
+    def copy_template(self, folder_id, source_file_id):
+        """Create a fake copy of the template inside the given folder"""
+        return self._create_file(f"Copy of {source_file_id}", folder_id)
+
+    def format_document_title(self, unformatted_report_id, formatted_title):
+        """Rename a fake copy of the template"""
+        self.calls += 1
+        time.sleep(self.latency)
+        self.files[unformatted_report_id]["name"] = formatted_title
+        logger.info(f"Report created for: {formatted_title} (fake drive)")
@@ -0,0 +1,116 @@
+# Provides a pool of authorized keep-alive HTTP connections shared by the Google API service objects.
+import queue
+import threading
+from contextlib import contextmanager
+import httplib2
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.discovery import build
+from module5.utils import logger
+
+DEFAULT_POOL_SIZE = 4 # Number of connections kept open at the same time
+DEFAULT_TIMEOUT = 60 # Socket timeout in seconds
+DEFAULT_CHECKOUT_TIMEOUT = 30 # Seconds a thread waits for a free connection
+
+class _PoolOnlyHttp:
+    """Placeholder transport of pooled service objects, so calls that bypass the pool fail loudly"""
+    def request(self, *args, **kwargs):
+        raise RuntimeError("Requests of pooled service objects must be run with HttpPool.execute()")
+
+    def close(self):
+        pass
+
+class HttpPool:
+    def __init__(self, credentials, pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT,
+                 checkout_timeout=DEFAULT_CHECKOUT_TIMEOUT):
+        """
+        Initialize the HttpPool with the credentials used to authorize every connection.
+
+        httplib2 connections are not thread-safe, so each thread checks out its own
+        connection from the pool and keeps it until it is done. Connections are kept
+        alive between calls and the most recently used one is handed out first, which
+        avoids new TLS handshakes as long as the connection is still warm.
+
+        Args:
+            credentials (google.oauth2.credentials.Credentials): The OAuth2 credentials
+                                                                 for accessing Google APIs.
+            pool_size (int): The maximum number of connections open at the same time.
+            timeout (int): The socket timeout in seconds of each connection.
+            checkout_timeout (int): The seconds a thread waits for a free connection.
+
+        Raises:
+            ValueError: If `pool_size` is less than 1.
+        """
+        if pool_size < 1:
+            raise ValueError("pool_size must be at least 1")
+
+        self.credentials = credentials
+        self.timeout = timeout
+        self.checkout_timeout = checkout_timeout
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+        for _ in range(pool_size):
+            self._pool.put(self._new_http())
+        self._local = threading.local()
+        logger.debug(f"# HTTP pool created with {pool_size} connections")
+
+    def _new_http(self):
+        """Create a new authorized keep-alive connection"""
+        return AuthorizedHttp(self.credentials, http=httplib2.Http(timeout=self.timeout))
+
+    def build_service(self, service_name, version):
+        """
+        Build a Google API service object whose calls are sent through the pool.
+
+        The service object itself is only used to create requests; requests must be run
+        with `execute` so they use the connection checked out by the current thread. The
+        service object holds no connection of its own, so calling `.execute()` on one of
+        its requests directly raises a RuntimeError instead of bypassing the pool.
+
+        Args:
+            service_name (str): The name of the API, e.g. 'drive' or 'docs'.
+            version (str): The version of the API, e.g. 'v3'.
+
+        Returns:
+            googleapiclient.discovery.Resource: The service object.
+        """
+        return build(service_name, version, http=_PoolOnlyHttp(), cache_discovery=False)
+
+    @contextmanager
+    def connection(self):
+        """
+        Check out a connection for the current thread and return it to the pool when done.
+        Nested calls from the same thread reuse the connection already checked out.
+
+        Raises:
+            TimeoutError: If no connection is returned to the pool within the checkout timeout.
+        """
+        http = getattr(self._local, "http", None)
+        if http is not None:
+            yield http
+            return
+
+        try:
+            http = self._pool.get(timeout=self.checkout_timeout)
+        except queue.Empty:
+            logger.error(f"No pooled connection became available within {self.checkout_timeout} seconds")
+            raise TimeoutError("All pooled HTTP connections are in use; increase pool_size "
+                               "or use fewer threads") from None
+        self._local.http = http
+        try:
+            yield http
+        finally:
+            self._local.http = None
+            self._pool.put(http)
+
+    def execute(self, request, **kwargs):
+        """
+        Execute a Google API request (or batch request) on a pooled connection.
+
+        Args:
+            request (googleapiclient.http.HttpRequest): The request to execute.
+            **kwargs: Extra arguments passed on to `request.execute`.
+
+        Returns:
+            The response of the request.
+        """
+        with self.connection() as http:
+            return request.execute(http=http, **kwargs)
@@ -1,3 +1,4 @@
+import csv
 import os
 import sqlite3
 from datetime import datetime
@@ -102,25 +103,248 @@ class DatabaseManager:
         utils.logger.debug("# Calling select_all_students():")
         return self.execute_query(query)
 
-    def select_students_test(self):
+    def select_students_test(self, per_course=2, sample_size=None):
         """
-        Select a small subset of student data to use as a test use this method when 
+        Select a small subset of student data to use as a test use this method when
         testing changes or any time a short test of functionality is needed.
 
+        The subset is a deterministic stratified sample: the first `per_course` students
+        (by student ID) of every course, so a test run creates every course folder. If
+        `sample_size` is given, the sample is cut down by taking the first student of each
+        course before the second student of any course, and so on.
+
+        Args:
+            per_course (int): The number of students to select from each course.
+            sample_size (int): Optional limit on the total number of rows.
+
         Returns:
-            list: The results of the selection
+            list: The results of the selection, ordered by Course ID then Student ID.
+
+        Raises:
+            ValueError: If `per_course` or `sample_size` is less than 1.
         """
+        if per_course < 1 or (sample_size is not None and sample_size < 1):
+            raise ValueError("per_course and sample_size must be at least 1")
+
         query="""
-        SELECT last_name, first_name, courses.name as course_name
+        SELECT last_name, first_name, course_name
+        FROM (
+            SELECT last_name, first_name, course_id, course_name, course_rank
+            FROM (
+                SELECT last_name, first_name, courses.id as course_id, courses.name as course_name,
+                       ROW_NUMBER() OVER (PARTITION BY courses.id ORDER BY students.id) as course_rank
+                FROM students
+                JOIN enrollments ON students.id = enrollments.student_id
+                JOIN courses ON enrollments.course_id = courses.id
+            )
+            WHERE course_rank <= ?
+            ORDER BY course_rank, course_id
+            LIMIT ?
+        )
+        ORDER BY course_id, course_rank;
+        """
+        utils.logger.debug("# Calling select_students_test():")
+        return self.execute_query(query, (per_course, -1 if sample_size is None else sample_size))
+
+    def count_roster(self):
+        """
+        Count the reports and course folders a normal run would create.
+
+        Returns:
+            tuple: The number of enrollments and the number of distinct courses.
+        """
+        query = """
+        SELECT COUNT(*), COUNT(DISTINCT courses.id)
         FROM students
         JOIN enrollments ON students.id = enrollments.student_id
-        JOIN courses ON enrollments.course_id = courses.id 
-        ORDER BY courses.id
-        LIMIT 10;
+        JOIN courses ON enrollments.course_id = courses.id;
         """
-        utils.logger.debug("# Calling select_students_test():")
+        utils.logger.debug("# Calling count_roster():")
+        results = self.execute_query(query)
+        return results[0] if results else (0, 0)
+
+
+    def create_teacher_tables(self):
+        """
+        Create the tables linking courses to their teachers, if they do not exist yet.
+
+        `teachers` holds one row per teacher email and `course_teachers` links each
+        course to one or more teachers, so co-taught courses are supported.
+        """
+        create_query = """
+        CREATE TABLE IF NOT EXISTS teachers (
+            id INTEGER PRIMARY KEY,
+            email TEXT NOT NULL UNIQUE
+        );
+        CREATE TABLE IF NOT EXISTS course_teachers (
+            course_id INTEGER NOT NULL REFERENCES courses(id),
+            teacher_id INTEGER NOT NULL REFERENCES teachers(id),
+            PRIMARY KEY (course_id, teacher_id)
+        );
+        """
+        utils.logger.debug("# Calling create_teacher_tables():")
+        cursor = self.establish_connection()
+        if cursor is None:
+            raise ConnectionError("Failed to establish connection to SQLite database")
+        try:
+            cursor.executescript(create_query)
+            self.connection.commit()
+        except sqlite3.Error as error:
+            utils.logger.error(f"Error creating teacher tables: {error}")
+            raise
+        finally:
+            self.close_and_disconnect()
+
+    def import_course_teachers(self, csv_path):
+        """
+        Load the teacher of each course from a CSV file with a `course_name,teacher_email`
+        header. A course may appear on several lines, one per teacher. Links that are
+        already in the database are skipped, and courses that are not in the `courses`
+        table are skipped with a warning.
+
+        Args:
+            csv_path (str): The file path of the CSV file.
+
+        Returns:
+            int: The number of new course to teacher links.
+        """
+        utils.logger.debug(f"# Calling import_course_teachers({csv_path}):")
+        with open(csv_path, newline="", encoding="utf-8") as csv_file:
+            rows = [(row["course_name"].strip(), row["teacher_email"].strip().lower())
+                    for row in csv.DictReader(csv_file)
+                    if row["course_name"].strip() and row["teacher_email"].strip()]
+
+        self.create_teacher_tables()
+        cursor = self.establish_connection()
+        if cursor is None:
+            raise ConnectionError("Failed to establish connection to SQLite database")
+        try:
+            course_ids = dict(cursor.execute("SELECT name, id FROM courses;").fetchall())
+            unknown = sorted({course_name for course_name, _ in rows if course_name not in course_ids})
+            if unknown:
+                utils.logger.warning(f"Skipping teachers of courses not in the database: {', '.join(unknown)}")
+
+            cursor.executemany("INSERT OR IGNORE INTO teachers (email) VALUES (?);",
+                               [(email,) for _, email in rows])
+            teacher_ids = dict(cursor.execute("SELECT email, id FROM teachers;").fetchall())
+            cursor.executemany("INSERT OR IGNORE INTO course_teachers (course_id, teacher_id) VALUES (?, ?);",
+                               [(course_ids[course_name], teacher_ids[email])
+                                for course_name, email in rows if course_name in course_ids])
+            self.connection.commit()
+            utils.logger.info(f"Successfully linked {cursor.rowcount} new course teachers in database.")
+            return cursor.rowcount
+        except sqlite3.Error as error:
+            self.connection.rollback()
+            utils.logger.error(f"Error importing course teachers: {error}")
+            raise
+        finally:
+            self.close_and_disconnect()
+
+    def has_teacher_mapping(self):
+        """
+        Check whether the database links courses to teachers, i.e. whether it has the
+        tables created by `create_teacher_tables`.
+
+        Returns:
+            bool: True if the course to teacher mapping can be read.
+        """
+        query = """
+        SELECT COUNT(*) FROM sqlite_master
+        WHERE type = 'table' AND name IN ('teachers', 'course_teachers');
+        """
+        utils.logger.debug("# Calling has_teacher_mapping():")
+        results = self.execute_query(query)
+        return bool(results) and results[0][0] == 2
+
+    def select_course_teachers(self):
+        """
+        Select the email address of the teachers of every course. Use this method to
+        share each course folder with its teachers.
+
+        Returns:
+            list: The course name and teacher email of each course teacher, or an empty
+                  list if the database has no teacher tables.
+        """
+        if not self.has_teacher_mapping():
+            utils.logger.warning("No teacher tables in the database (see import_teachers.py); "
+                                 "course folders will not be shared.")
+            return []
+
+        query = """
+        SELECT courses.name as course_name, teachers.email
+        FROM courses
+        JOIN course_teachers ON courses.id = course_teachers.course_id
+        JOIN teachers ON course_teachers.teacher_id = teachers.id
+        ORDER BY courses.id, teachers.email;
+        """
+        utils.logger.debug("# Calling select_course_teachers():")
         return self.execute_query(query)
-    
+
+    def count_course_teachers(self):
+        """
+        Count the course folders a normal run would share and the grants it would make.
+        Only courses with enrollments are counted, since a run only creates folders for them.
+
+        Returns:
+            tuple: The number of courses with a teacher and the number of course teachers,
+                   or (0, 0) if the database has no teacher tables.
+        """
+        if not self.has_teacher_mapping():
+            return (0, 0)
+
+        query = """
+        SELECT COUNT(DISTINCT course_teachers.course_id), COUNT(*)
+        FROM course_teachers
+        WHERE course_teachers.course_id IN (SELECT course_id FROM enrollments);
+        """
+        utils.logger.debug("# Calling count_course_teachers():")
+        results = self.execute_query(query)
+        return results[0] if results else (0, 0)
+
+    def save_archive_manifest(self, manifest):
+        """
+        Save the list of reports contained in archived term folders to the database.
+        Use this method once a term has been archived so the report IDs can still be found
+        after the term folder has left the parent directory. Reports that are already in
+        the table are skipped, so saving the same term twice does not duplicate rows.
+
+        Args:
+            manifest(list): A list of dictionaries, where each dictionary contains the
+            term folder name, course name, report ID and report name.
+        """
+        create_query = """
+        CREATE TABLE IF NOT EXISTS archived_reports (
+            term_folder TEXT NOT NULL,
+            course_name TEXT NOT NULL,
+            report_id TEXT NOT NULL UNIQUE,
+            report_name TEXT NOT NULL,
+            archived_at TEXT NOT NULL
+        );
+        """
+        insert_query = """
+        INSERT OR IGNORE INTO archived_reports (term_folder, course_name, report_id, report_name, archived_at)
+        VALUES (:term_folder, :course_name, :report_id, :report_name, :archived_at);
+        """
+        utils.logger.debug("# Calling save_archive_manifest():")
+
+        archived_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        rows = [dict(report, archived_at=archived_at) for report in manifest]
+
+        cursor = self.establish_connection()
+        if cursor is None:
+            raise ConnectionError("Failed to establish connection to SQLite database")
+        try:
+            cursor.execute(create_query)
+            cursor.executemany(insert_query, rows)
+            self.connection.commit()
+            utils.logger.info(f"Successfully saved {cursor.rowcount} new archived reports to database.")
+        except sqlite3.Error as error:
+            self.connection.rollback()
+            utils.logger.error(f"Error saving archive manifest: {error}")
+            raise
+        finally:
+            self.close_and_disconnect()
+
 class TermTransitionManager:
     def __init__(self, db_manager):
         """
@@ -259,22 +483,24 @@ class TermTransitionManager:
 # Delete from enrollments (aka the term has finished)
 # Update enrollments table (aka enroll in new electives)
 
-enrolled_students_test = [{"first_name": "Alice", "last_name": "Smith", "year": 1999},
-                          {"first_name": "Bob", "last_name": "Davis", "year": 1999}]
+# Manual check of TermTransitionManager; only runs when this file is executed directly
+if __name__ == "__main__":
+    enrolled_students_test = [{"first_name": "Alice", "last_name": "Smith", "year": 1999},
+                              {"first_name": "Bob", "last_name": "Davis", "year": 1999}]
 
-# Create instance of db_manager
-db_manager = DatabaseManager('../data/roster.db')
-transition_manager = TermTransitionManager(db_manager)
+    # Create instance of db_manager
+    db_manager = DatabaseManager('../data/roster.db')
+    transition_manager = TermTransitionManager(db_manager)
 
-# Enroll new students
-transition_manager.enroll_new_students(enrolled_students_test)
+    # Enroll new students
+    transition_manager.enroll_new_students(enrolled_students_test)
 
-print(f"The following students have been added to the database: {enrolled_students_test}")
-print("--Running #delete_students():")
+    print(f"The following students have been added to the database: {enrolled_students_test}")
+    print("--Running #delete_students():")
 
-deleted_students_test = [{"first_name": "Alice", "last_name": "Smith", "year": 1999},
-                        {"first_name": "Bob", "last_name": "Davis", "year": 1999}]
-# Delete current students
-transition_manager.delete_current_students(deleted_students_test)
+    deleted_students_test = [{"first_name": "Alice", "last_name": "Smith", "year": 1999},
+                            {"first_name": "Bob", "last_name": "Davis", "year": 1999}]
+    # Delete current students
+    transition_manager.delete_current_students(deleted_students_test)
 
-print(f"The following students were deleted: {deleted_students_test}")
\ No newline at end of file
+    print(f"The following students were deleted: {deleted_students_test}")
\ No newline at end of file
@@ -0,0 +1,321 @@
+import mmap
+import struct
+from array import array
+import module5.utils as utils
+
+# File layout: header, 64-bit ID arrays, 32-bit code arrays, string offsets, string data.
+# Arrays are stored in native byte order so a saved snapshot can be memory-mapped as is.
+MAGIC = b"RSNAP002"
+HEADER = struct.Struct("<8s4I8x") # magic, strings, students, courses, enrollments (padded to 32 bytes)
+
+class _StringTable:
+    """Read-only view of the interned strings of a memory-mapped snapshot"""
+    def __init__(self, offsets, data):
+        self.offsets = offsets
+        self.data = data
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        return str(self.data[self.offsets[index]:self.offsets[index + 1]], "utf-8")
+
+class RosterSnapshot:
+    def __init__(self, strings, student_ids, student_last, student_first,
+                 course_ids, course_names, course_offsets, enrollment_students, mapped=None, views=()):
+        """
+        Initialize a RosterSnapshot from its columns.
+
+        Students and courses are identified by integer codes: their position in the
+        student and course columns. Names are stored once in an interned string table
+        and referenced by index. Enrollments are grouped by course, so the students of
+        course `c` are `enrollment_students[course_offsets[c]:course_offsets[c + 1]]`.
+
+        Use `from_database` or `load` rather than calling this constructor directly.
+
+        Args:
+            strings (list): The interned student and course names.
+            student_ids (array): The database ID of each student.
+            student_last (array): The string index of each student's last name.
+            student_first (array): The string index of each student's first name.
+            course_ids (array): The database ID of each course, in course ID order.
+            course_names (array): The string index of each course name.
+            course_offsets (array): The start of each course's enrollments, plus the total.
+            enrollment_students (array): The student code of each enrollment.
+            mapped (mmap.mmap): The memory map backing the columns, if loaded from a file.
+            views (list): The memoryviews of the memory map, released by `close`.
+        """
+        self.strings = strings
+        self.student_ids = student_ids
+        self.student_last = student_last
+        self.student_first = student_first
+        self.course_ids = course_ids
+        self.course_names = course_names
+        self.course_offsets = course_offsets
+        self.enrollment_students = enrollment_students
+        self._mapped = mapped
+        self._views = list(views)
+
+    @classmethod
+    def from_database(cls, db_manager):
+        """
+        Build a snapshot from a single pass over the students/enrollments/courses join.
+
+        Args:
+            db_manager (DatabaseManager): The instance of the DatabaseManager to read from.
+
+        Returns:
+            RosterSnapshot: The snapshot of the current roster.
+        """
+        query = """
+        SELECT students.id, last_name, first_name, courses.id, courses.name
+        FROM students
+        JOIN enrollments ON students.id = enrollments.student_id
+        JOIN courses ON enrollments.course_id = courses.id
+        ORDER BY courses.id, students.id;
+        """
+        utils.logger.debug("# Calling RosterSnapshot.from_database():")
+        rows = db_manager.execute_query(query) or []
+
+        strings, string_codes = [], {}
+        def intern(value):
+            code = string_codes.get(value)
+            if code is None:
+                code = string_codes[value] = len(strings)
+                strings.append(value)
+            return code
+
+        student_ids, student_last, student_first = array("q"), array("i"), array("i")
+        course_ids, course_names, course_offsets = array("q"), array("i"), array("i")
+        enrollment_students = array("i")
+        student_codes = {}
+
+        for student_id, last_name, first_name, course_id, course_name in rows:
+            # Rows are ordered by course, so a new course ID starts a new group
+            if not course_ids or course_ids[-1] != course_id:
+                course_ids.append(course_id)
+                course_names.append(intern(course_name))
+                course_offsets.append(len(enrollment_students))
+
+            student_code = student_codes.get(student_id)
+            if student_code is None:
+                student_code = student_codes[student_id] = len(student_ids)
+                student_ids.append(student_id)
+                student_last.append(intern(last_name))
+                student_first.append(intern(first_name))
+            enrollment_students.append(student_code)
+        course_offsets.append(len(enrollment_students))
+
+        utils.logger.info(f"Roster snapshot built: {len(student_ids)} students, "
+                          f"{len(course_ids)} courses, {len(enrollment_students)} enrollments.")
+        return cls(strings, student_ids, student_last, student_first,
+                   course_ids, course_names, course_offsets, enrollment_students)
+
+    def save(self, path):
+        """
+        Save the snapshot to a single file that can be memory-mapped with `load`.
+
+        Args:
+            path (str): The file path of the snapshot.
+        """
+        utils.logger.debug(f"# Calling RosterSnapshot.save({path}):")
+        encoded = [self.strings[index].encode("utf-8") for index in range(len(self.strings))]
+        string_offsets = array("i", [0])
+        for value in encoded:
+            string_offsets.append(string_offsets[-1] + len(value))
+
+        with open(path, "wb") as snapshot_file:
+            snapshot_file.write(HEADER.pack(MAGIC, len(encoded), len(self.student_ids),
+                                            len(self.course_ids), len(self.enrollment_students)))
+            for column, typecode in ((self.student_ids, "q"), (self.course_ids, "q"),
+                                     (self.student_last, "i"), (self.student_first, "i"),
+                                     (self.course_names, "i"), (self.course_offsets, "i"),
+                                     (self.enrollment_students, "i"), (string_offsets, "i")):
+                snapshot_file.write(array(typecode, column).tobytes())
+            snapshot_file.write(b"".join(encoded))
+        utils.logger.info(f"Roster snapshot saved to: {path}")
+
+    @classmethod
+    def load(cls, path):
+        """
+        Memory-map a snapshot saved with `save`. The columns are read directly from the
+        mapped file, so loading does not depend on the size of the roster.
+
+        Args:
+            path (str): The file path of the snapshot.
+
+        Returns:
+            RosterSnapshot: The memory-mapped snapshot.
+
+        Raises:
+            ValueError: If the file is not a roster snapshot or is truncated.
+        """
+        utils.logger.debug(f"# Calling RosterSnapshot.load({path}):")
+        with open(path, "rb") as snapshot_file:
+            mapped = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(mapped) < HEADER.size or mapped[:len(MAGIC)] != MAGIC:
+            mapped.close()
+            raise ValueError(f"Not a roster snapshot: {path}")
+        _, n_strings, n_students, n_courses, n_enrollments = HEADER.unpack_from(mapped)
+
+        # Column order and lengths, as written by `save`
+        layout = (("q", n_students), ("q", n_courses), ("i", n_students), ("i", n_students),
+                  ("i", n_courses), ("i", n_courses + 1), ("i", n_enrollments), ("i", n_strings + 1))
+        columns_end = HEADER.size + sum(length * array(typecode).itemsize for typecode, length in layout)
+        # The file must hold every column, and the last string offset is the size of the string data
+        if len(mapped) < columns_end or \
+                len(mapped) < columns_end + struct.unpack_from("i", mapped, columns_end - 4)[0]:
+            mapped.close()
+            raise ValueError(f"Truncated roster snapshot: {path}")
+
+        view = memoryview(mapped)
+        views = [view]
+        position = HEADER.size
+        for typecode, length in layout:
+            size = length * array(typecode).itemsize
+            views.append(view[position:position + size].cast(typecode))
+            position += size
+        (student_ids, course_ids, student_last, student_first,
+         course_names, course_offsets, enrollment_students, string_offsets) = views[1:]
+
+        string_data = view[position:]
+        views.append(string_data)
+        strings = _StringTable(string_offsets, string_data)
+
+        return cls(strings, student_ids, student_last, student_first,
+                   course_ids, course_names, course_offsets, enrollment_students, mapped, views)
+
+    def close(self):
+        """
+        Release the memory map of a snapshot loaded from a file.
+
+        The slices returned by `enrollments_for` point into the memory map, so they must be
+        deleted (or copied with `list()`) before the snapshot is closed.
+
+        Raises:
+            BufferError: If a slice returned by `enrollments_for` is still referenced.
+        """
+        if self._mapped is not None:
+            self.student_ids = self.student_last = self.student_first = None
+            self.course_ids = self.course_names = self.course_offsets = None
+            self.enrollment_students = self.strings = None
+            for view in reversed(self._views):
+                view.release()
+            self._views = []
+            try:
+                self._mapped.close()
+            except BufferError as error:
+                utils.logger.error("Roster snapshot closed while slices of it are still in use")
+                raise BufferError("Delete the slices returned by enrollments_for() before "
+                                  "closing the roster snapshot") from error
+            self._mapped = None
+
+    def __len__(self):
+        return len(self.enrollment_students)
+
+    def course_name(self, course_code):
+        """Return the name of the course with the given code"""
+        return self.strings[self.course_names[course_code]]
+
+    def student_name(self, student_code):
+        """Return the (last name, first name) of the student with the given code"""
+        return self.strings[self.student_last[student_code]], self.strings[self.student_first[student_code]]
+
+    def enrollments_for(self, course_code):
+        """Return the student codes enrolled in the course with the given code (a view, not a copy)"""
+        return self.enrollment_students[self.course_offsets[course_code]:self.course_offsets[course_code + 1]]
+
+    def rows(self, per_course=None):
+        """
+        Yield the roster in the same shape and order as `DatabaseManager.select_all_students`.
+
+        Args:
+            per_course (int): Optional limit on the number of students yielded per course.
+
+        Yields:
+            tuple: The last name, first name and course name of each enrollment.
+        """
+        for course_code in range(len(self.course_ids)):
+            course_name = self.course_name(course_code)
+            for student_code in self.enrollments_for(course_code)[:per_course]:
+                last_name, first_name = self.student_name(student_code)
+                yield last_name, first_name, course_name
+
+    def stratified_sample(self, per_course, total=None):
+        """
+        Select the first `per_course` students of every course, so a test run touches
+        every course folder instead of only the first few courses. If `total` is given,
+        the first student of each course is taken before the second student of any course,
+        and so on. This is the same sample as `DatabaseManager.select_students_test`.
+
+        Args:
+            per_course (int): The number of students to select from each course.
+            total (int): Optional limit on the total number of rows.
+
+        Returns:
+            list: The last name, first name and course name of each selected enrollment,
+                  ordered by course.
+
+        Raises:
+            ValueError: If `per_course` or `total` is less than 1.
+        """
+        if per_course < 1 or (total is not None and total < 1):
+            raise ValueError("per_course and total must be at least 1")
+
+        picks = []
+        for rank in range(per_course):
+            for course_code in range(len(self.course_ids)):
+                if total is not None and len(picks) >= total:
+                    break
+                if self.course_offsets[course_code] + rank < self.course_offsets[course_code + 1]:
+                    picks.append((course_code, rank))
+
+        sample = []
+        for course_code, rank in sorted(picks):
+            last_name, first_name = self.student_name(self.enrollment_students[self.course_offsets[course_code] + rank])
+            sample.append((last_name, first_name, self.course_name(course_code)))
+        return sample
+
+    def enrollment_keys(self):
+        """Return the set of (student ID, course ID) database pairs in the snapshot"""
+        keys = set()
+        for course_code in range(len(self.course_ids)):
+            course_id = self.course_ids[course_code]
+            keys.update((self.student_ids[student_code], course_id)
+                        for student_code in self.enrollments_for(course_code))
+        return keys
+
+    def diff(self, other):
+        """
+        Compare the enrollments of this snapshot with those of an older snapshot.
+
+        Args:
+            other (RosterSnapshot): The snapshot to compare against.
+
+        Returns:
+            tuple: The sets of (student ID, course ID) pairs that were added and removed.
+        """
+        current, previous = self.enrollment_keys(), other.enrollment_keys()
+        return current - previous, previous - current
+
+if __name__ == "__main__":
+    import argparse
+    from module4.database import DatabaseManager
+
+    # Parse command-line arguments
+    parser = argparse.ArgumentParser(description="Build a roster snapshot and compare it with an older one.")
+    parser.add_argument("snapshot_path", type=str, help="File the new roster snapshot is saved to")
+    parser.add_argument("--db-path", type=str, default="data/roster.db", help="Path of the roster database")
+    parser.add_argument("--diff", type=str, default=None, help="Older roster snapshot to compare against")
+    args = parser.parse_args()
+
+    snapshot = RosterSnapshot.from_database(DatabaseManager(args.db_path))
+    snapshot.save(args.snapshot_path)
+
+    # Log the enrollments added and removed since the older snapshot
+    if args.diff:
+        previous = RosterSnapshot.load(args.diff)
+        added, removed = snapshot.diff(previous)
+        previous.close()
+        utils.logger.info(f"Since {args.diff}: {len(added)} enrollments added, {len(removed)} removed.")
@@ -47,3 +47,53 @@ file_handler.setFormatter(file_fmt)
 
 # Add file handler for file logging
 logger.addHandler(file_handler) 
+
+"""Test Run Projection"""
+DRIVE_QUOTA_PER_MINUTE = 12000 # Default Google Drive API queries per minute per user
+
+def log_run_projection(sample_folders, folder_seconds, sample_reports, report_seconds, total_folders, total_reports,
+                       share_calls=0, simulated_latency=None):
+    """
+    Extrapolate the run time and Drive API usage of a normal run from a test run.
+
+    Each course folder costs one call and each report costs two (copy and rename), plus 
+    one call for the term folder and the calls made to share the course folders. The time 
+    per folder and per report measured on the sample is applied to the size of the full 
+    roster; sharing is not timed by test runs, so it is left out of the projected time.
+
+    Args:
+        sample_folders (int): The number of course folders created by the test run.
+        folder_seconds (float): The time spent creating those course folders.
+        sample_reports (int): The number of reports created by the test run.
+        report_seconds (float): The time spent creating those reports.
+        total_folders (int): The number of course folders a normal run would create.
+        total_reports (int): The number of reports a normal run would create.
+        share_calls (int): The number of permission list and create calls a normal run would make.
+        simulated_latency (float): The latency per call of the fake drive, if the test run used it.
+                                   The time is not projected when it is 0.
+
+    Returns:
+        tuple: The projected run time in seconds (None if not projected) and the projected 
+               number of API calls.
+    """
+    per_folder = folder_seconds / sample_folders if sample_folders else 0
+    per_report = report_seconds / sample_reports if sample_reports else 0
+    projected_calls = 1 + total_folders + 2 * total_reports + share_calls
+    quota_minutes = projected_calls / DRIVE_QUOTA_PER_MINUTE
+
+    logger.info(f"Projected normal run: {total_folders} folders, {total_reports} reports, "
+                f"{projected_calls} API calls ({share_calls} for sharing)")
+    logger.info(f"Projected calls use {quota_minutes:.1f} minutes of Drive quota "
+                f"({DRIVE_QUOTA_PER_MINUTE} queries per minute)")
+
+    # A fake drive without latency measures nothing, so there is no time to extrapolate
+    if simulated_latency == 0:
+        logger.info("Run time not projected: the fake drive has no latency (set --fake-latency).")
+        return None, projected_calls
+
+    projected_seconds = per_folder * total_folders + per_report * total_reports
+    label = f" (simulated with {simulated_latency}s per call)" if simulated_latency else ""
+    logger.info(f"Sample: {sample_folders} folders ({per_folder:.3f}s each), "
+                f"{sample_reports} reports ({per_report:.3f}s each){label}")
+    logger.info(f"Projected normal run time: {projected_seconds / 60:.1f} minutes, excluding sharing{label}")
+    return projected_seconds, projected_calls
@@ -0,0 +1,54 @@
+import sqlite3
+import pytest
+from module4.database import DatabaseManager
+
+@pytest.fixture
+def db_manager(tmp_path):
+    """A roster database with three courses, the last of which has no enrollments"""
+    db_path = tmp_path / "roster.db"
+    connection = sqlite3.connect(db_path)
+    connection.executescript("""
+    CREATE TABLE students (id INTEGER PRIMARY KEY, first_name TEXT, last_name TEXT, year INTEGER);
+    CREATE TABLE courses (id INTEGER PRIMARY KEY, name TEXT);
+    CREATE TABLE enrollments (student_id INTEGER, course_id INTEGER);
+    INSERT INTO students VALUES (1, 'Ada', 'Lovelace', 2030), (2, 'Alan', 'Turing', 2030);
+    INSERT INTO courses VALUES (1, 'Math 6'), (2, 'Science 6'), (3, 'Art 6');
+    INSERT INTO enrollments VALUES (1, 1), (2, 1), (1, 2);
+    """)
+    connection.commit()
+    connection.close()
+    return DatabaseManager(str(db_path))
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / "teachers.csv"
+    path.write_text("course_name,teacher_email\n"
+                    "Math 6,Grace@School.org\n"
+                    "Science 6,grace@school.org\n"
+                    "Science 6,katherine@school.org\n"
+                    "Art 6,frida@school.org\n"
+                    "Music 6,ludwig@school.org\n", encoding="utf-8")
+    return path
+
+def test_no_teacher_tables(db_manager):
+    assert not db_manager.has_teacher_mapping()
+    assert db_manager.select_course_teachers() == []
+    assert db_manager.count_course_teachers() == (0, 0)
+
+def test_import_course_teachers(db_manager, csv_path):
+    assert db_manager.import_course_teachers(str(csv_path)) == 4
+
+    assert db_manager.select_course_teachers() == [("Math 6", "grace@school.org"),
+                                                   ("Science 6", "grace@school.org"),
+                                                   ("Science 6", "katherine@school.org"),
+                                                   ("Art 6", "frida@school.org")]
+    assert db_manager.execute_query("SELECT COUNT(*) FROM teachers;") == [(4,)]
+
+def test_import_course_teachers_twice(db_manager, csv_path):
+    db_manager.import_course_teachers(str(csv_path))
+    assert db_manager.import_course_teachers(str(csv_path)) == 0
+    assert len(db_manager.select_course_teachers()) == 4
+
+def test_count_course_teachers_skips_courses_without_enrollments(db_manager, csv_path):
+    db_manager.import_course_teachers(str(csv_path))
+    assert db_manager.count_course_teachers() == (2, 3)
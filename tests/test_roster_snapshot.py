@@ -0,0 +1,117 @@
+import sqlite3
+import pytest
+from module4.database import DatabaseManager
+from module4.roster_snapshot import RosterSnapshot
+
+# Number of students enrolled in each course; uneven so sampling has to skip small courses
+COURSE_SIZES = [6, 1, 3, 4, 2]
+
+@pytest.fixture
+def db_manager(tmp_path):
+    """A roster database with students, courses and enrollments tables"""
+    db_path = tmp_path / "roster.db"
+    connection = sqlite3.connect(db_path)
+    connection.executescript("""
+    CREATE TABLE students (id INTEGER PRIMARY KEY, first_name TEXT, last_name TEXT, year INTEGER);
+    CREATE TABLE courses (id INTEGER PRIMARY KEY, name TEXT);
+    CREATE TABLE enrollments (student_id INTEGER, course_id INTEGER);
+    """)
+    student_id = 0
+    for course_id, size in enumerate(COURSE_SIZES, start=1):
+        connection.execute("INSERT INTO courses VALUES (?, ?)", (course_id, f"Música {course_id}"))
+        for _ in range(size):
+            student_id += 1
+            connection.execute("INSERT INTO students VALUES (?, ?, ?, 2030)",
+                               (student_id, f"First{student_id}", f"Last{student_id % 4}"))
+            connection.execute("INSERT INTO enrollments VALUES (?, ?)", (student_id, course_id))
+    # Students enrolled in more than one course
+    connection.executemany("INSERT INTO enrollments VALUES (?, ?)", [(1, 3), (2, 5), (7, 1)])
+    connection.commit()
+    connection.close()
+    return DatabaseManager(str(db_path))
+
+@pytest.fixture
+def snapshot_path(db_manager, tmp_path):
+    path = tmp_path / "roster.snap"
+    RosterSnapshot.from_database(db_manager).save(str(path))
+    return path
+
+def test_save_and_load_round_trip(db_manager, snapshot_path):
+    built = RosterSnapshot.from_database(db_manager)
+    loaded = RosterSnapshot.load(str(snapshot_path))
+
+    assert list(loaded.rows()) == list(built.rows())
+    assert len(loaded) == len(built) == sum(COURSE_SIZES) + 3
+    assert loaded.diff(built) == (set(), set())
+    loaded.close()
+
+def test_rows_match_database_order(db_manager, snapshot_path):
+    snapshot = RosterSnapshot.load(str(snapshot_path))
+    rows = db_manager.execute_query("""
+    SELECT last_name, first_name, courses.name
+    FROM students
+    JOIN enrollments ON students.id = enrollments.student_id
+    JOIN courses ON enrollments.course_id = courses.id
+    ORDER BY courses.id, students.id;
+    """)
+    assert list(snapshot.rows()) == rows
+    snapshot.close()
+
+def test_stratified_sample_keeps_every_course_when_capped(snapshot_path):
+    snapshot = RosterSnapshot.load(str(snapshot_path))
+    sample = snapshot.stratified_sample(2, total=len(COURSE_SIZES) + 1)
+
+    assert len(sample) == len(COURSE_SIZES) + 1
+    assert {course_name for _, _, course_name in sample} == {snapshot.course_name(code)
+                                                           for code in range(len(COURSE_SIZES))}
+    snapshot.close()
+
+@pytest.mark.parametrize("per_course, total", [(1, None), (2, None), (10, None), (2, 3), (2, 7), (3, 100)])
+def test_stratified_sample_matches_select_students_test(db_manager, snapshot_path, per_course, total):
+    snapshot = RosterSnapshot.load(str(snapshot_path))
+    assert snapshot.stratified_sample(per_course, total) == db_manager.select_students_test(per_course, total)
+    snapshot.close()
+
+@pytest.mark.parametrize("per_course, total", [(0, None), (2, 0)])
+def test_stratified_sample_rejects_empty_samples(db_manager, snapshot_path, per_course, total):
+    snapshot = RosterSnapshot.load(str(snapshot_path))
+    with pytest.raises(ValueError):
+        snapshot.stratified_sample(per_course, total)
+    with pytest.raises(ValueError):
+        db_manager.select_students_test(per_course, total)
+    snapshot.close()
+
+def test_diff_reports_added_and_removed_enrollments(db_manager, snapshot_path):
+    previous = RosterSnapshot.load(str(snapshot_path))
+    db_manager.execute_query("DELETE FROM enrollments WHERE student_id = 1 AND course_id = 3;")
+    db_manager.execute_query("INSERT INTO enrollments VALUES (4, 2);")
+
+    added, removed = RosterSnapshot.from_database(db_manager).diff(previous)
+    assert added == {(4, 2)}
+    assert removed == {(1, 3)}
+    previous.close()
+
+def test_load_rejects_truncated_file(snapshot_path):
+    data = snapshot_path.read_bytes()
+    snapshot_path.write_bytes(data[:-3])
+    with pytest.raises(ValueError):
+        RosterSnapshot.load(str(snapshot_path))
+
+    snapshot_path.write_bytes(data[:40])
+    with pytest.raises(ValueError):
+        RosterSnapshot.load(str(snapshot_path))
+
+def test_load_rejects_other_files(tmp_path):
+    path = tmp_path / "other.snap"
+    path.write_bytes(b"not a roster snapshot at all, just some bytes")
+    with pytest.raises(ValueError):
+        RosterSnapshot.load(str(path))
+
+def test_close_while_slice_in_use(snapshot_path):
+    snapshot = RosterSnapshot.load(str(snapshot_path))
+    students = snapshot.enrollments_for(0)
+    with pytest.raises(BufferError):
+        snapshot.close()
+
+    del students
+    snapshot.close()